@@ -40,7 +40,7 @@ classDiagram
 ```
 
 """
-from typing import Annotated, Self
+from typing import Annotated, Self, ValuesView
 
 # A workaround is needed to make mesa work properly in the browser, since the full package contains dependencies that do not work in that environment.
 # Therefore, importing the whole of mesa fails, and instead the few classes needed are imported individually.
@@ -60,15 +60,18 @@ class Model(MesaModel, Viewable):
         # Create time and space, using a staged activation scheduler based on the OODA loop
         self.schedule = StagedActivation(self, ["observe", "orient", "decide", "act"])
 
-    def agents(self) -> list["Agent"]:
+    def agents(self) -> ValuesView["Agent"]:
         """
         Returns the agents in the model.
+        This is a live view of the agents in the schedule, so no new list is built on each call.
+        It should therefore not be iterated over while agents are being added or removed.
 
         Returns:
-            list[Agent]: the agents
+            ValuesView[Agent]: the agents
         """
         # We only create core.Agent, and not any other mesa.Agent, so safe to ignore type error
-        return self.schedule.agents # type: ignore
+        # The schedule's agents property copies its internal dict to a new list on every access, so use the dict directly.
+        return self.schedule._agents.values() # type: ignore
     
     def agent(self, id: int) -> "Agent":
         """
@@ -305,7 +305,7 @@ class Cargo(core.Entity):
         configuration.initialize(self)
 
         space = self.model.space
-        available_positions = space.road_nodes(space.is_destination)
+        available_positions = space.destination_nodes()
         space.place_agent(self, self.random.choice(available_positions))
 
         self.weight = self.random.choice(range(self.max_cargo_weight)) + 1
@@ -324,7 +324,7 @@ class Cargo(core.Entity):
             self.destination = destination
         else:
             space = self.model.space
-            self.destination = self.random.choice(space.road_nodes(lambda n: space.is_destination(n) and not space.is_charging_point(n)))
+            self.destination = self.random.choice(space.destination_nodes(lambda n: not space.is_charging_point(n)))
 
     def load_onto(self, carrier: Vehicle):
         """
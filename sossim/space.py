@@ -220,6 +220,11 @@ class RoadNetworkGrid(core.Space):
         self.coarse_network = RoadGridGraph(self.width, self.height)
         self.road_network = RoadGridGraph(self.width * 4, self.height * 4)
 
+        # Lists of all road nodes and destinations, to avoid searching through all nodes for them.
+        # They are determined when first needed.
+        self._road_nodes: list[Node] | None = None
+        self._destinations: list[Node] | None = None
+
         # Generate roads and destinations
         self.generate_roads()
 
@@ -235,6 +240,9 @@ class RoadNetworkGrid(core.Space):
         """
         result = copy.copy(self)
         result.road_network = nx.subgraph_view(self.road_network, filter_node = lambda node: node in nodes)
+        # The road nodes and destinations of the subgraph are determined when first needed.
+        result._road_nodes = None
+        result._destinations = None
         return result
 
     def generate_roads(self):
@@ -335,6 +343,10 @@ class RoadNetworkGrid(core.Space):
                             rnw.add_destination(node, destination, charging_point = charging_point)
                             break
 
+        # Discard any lists of road nodes and destinations determined while the roads were being generated.
+        self._road_nodes = None
+        self._destinations = None
+
     def _edge_preference(self, edge: Edge) -> float:
         """
         Provides a heuristic for adding edges to the coarse network during generation.
@@ -394,6 +406,7 @@ class RoadNetworkGrid(core.Space):
     def road_nodes(self, condition: Callable[[Node], bool] = lambda _: True) -> list[Node]:
         """
         Returns a list of all nodes which are connected by roads.
+        The road nodes are computed on first use and cached, so later calls only check the condition.
 
         Args:
             condition: a condition that the nodes must satisfy. Defaults to always True.
@@ -401,11 +414,14 @@ class RoadNetworkGrid(core.Space):
         Returns:
             list[Node]: the nodes connected by roads.
         """
-        return [n for n in self.road_network.nodes if self.road_network.is_road(n) and condition(n)]
+        if self._road_nodes is None:
+            self._road_nodes = [n for n in self.road_network.nodes if self.road_network.is_road(n)]
+        return [n for n in self._road_nodes if condition(n)]
 
     def destination_nodes(self, condition: Callable[[Node], bool] = lambda _: True) -> list[Node]:
         """
         Returns a list of all nodes which are destinations.
+        The list of destinations is built the first time it is needed, and then reused.
 
         Args:
             condition: a condition that the nodes must satisfy. Defaults to always True.
@@ -413,7 +429,9 @@ class RoadNetworkGrid(core.Space):
         Returns:
             list[Node]: the destinations.
         """
-        return [n for n in self.road_network.nodes if self.is_destination(n) and condition(n)]
+        if self._destinations is None:
+            self._destinations = [n for n in self.road_network.nodes if self.is_destination(n)]
+        return [n for n in self._destinations if condition(n)]
 
     def road_edges(self) -> list[Edge]:
         """
@@ -422,7 +440,8 @@ class RoadNetworkGrid(core.Space):
         Returns:
             list[Node]: the nodes connected by roads.
         """
-        return [Edge((n1, n2)) for (n1, n2) in self.road_network.edges if self.is_road(n1, n2)]
+        # Read the road attribute while iterating over the edges, rather than looking up each edge again.
+        return [Edge((n1, n2)) for (n1, n2, road) in self.road_network.edges(data = "road", default = False) if road]
 
     def roads_from(self, source: Node, condition: Callable[[Node], bool] = lambda _ : True) -> list[Node]:
         """
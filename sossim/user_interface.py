@@ -4,16 +4,18 @@ The user interface is based on the Model-View-Controller pattern.
 The module provides simulation controller and user interface elements, as well as views for different model elements.
 The user interface is provided as HTML DOM elements which is manipulated using the domed package.
 """
+import array
+from contextlib import contextmanager
 import io
-from typing import Any
+from typing import Any, Callable, Iterator
 import zipfile
 
 import js # type: ignore
-from pyodide.ffi import create_proxy # type: ignore
+from pyodide.ffi import create_once_callable, create_proxy, to_js # type: ignore
 
-from domed.core import create_tag, event_listener, document
+from domed.core import create_tag, event_listener, document, DomElement, wrap
 from domed.html import button, details, div, h3, input_, label, li, main, nav, option, p, select, span, style, summary, svg, ul
-from domed.svg import circle, defs, g, line, path, polygon, rect, svg
+from domed.svg import circle, defs, g, polygon, svg
 
 from sossim.configuration import Configuration
 from sossim.entities import Cargo, Vehicle
@@ -21,6 +23,69 @@ from sossim.model import TransportSystem
 from sossim.space import RoadNetworkGrid
 from sossim.view import View
 
+@contextmanager
+def fragment(q: str) -> Iterator[DomElement]:
+    """
+    Replaces the children of the element given by the query string with the elements created within the context.
+    The new elements are built in a detached document fragment, which is inserted into the document in one operation on exit.
+    This way, the browser only needs to update the layout once, instead of once for each element.
+    A typical usage is: with fragment(...).
+
+    Args:
+        q (str): a query string that yields the element whose children are replaced.
+
+    Yields:
+        DomElement: the document fragment.
+    """
+    parent = document.query(q)
+    with wrap(js.document.createDocumentFragment()) as f:
+        yield f
+    parent.unwrap().replaceChildren(f.unwrap())
+
+# Tasks to be carried out in the next animation frame, keyed to carry out each task at most once per frame.
+_frame_tasks: dict[Any, Callable[[], None]] = {}
+_frame_request = None
+
+def request_frame_task(key: Any, task: Callable[[], None]):
+    """
+    Schedules a task to be carried out in the next animation frame, i.e. just before the browser repaints the page.
+    This is used to batch updates of the DOM, so that the browser only needs to update the layout once per frame.
+    If a task with the same key is already scheduled, it is replaced.
+
+    Args:
+        key (Any): a key identifying the task.
+        task (Callable[[], None]): the task.
+    """
+    global _frame_request
+    _frame_tasks[key] = task
+    if _frame_request is None:
+        _frame_request = js.requestAnimationFrame(create_once_callable(_run_frame_tasks))
+
+def _run_frame_tasks(timestamp: float):
+    """
+    Carries out the tasks scheduled for this animation frame.
+
+    Args:
+        timestamp (float): the time of the animation frame (ignored).
+    """
+    global _frame_request
+    tasks = list(_frame_tasks.values())
+    _frame_tasks.clear()
+    _frame_request = None
+    for task in tasks:
+        task()
+
+# The rotation part of SVG transforms for each of the four headings of a vehicle, precomputed to avoid formatting it on every move.
+_ROTATE = { heading : f" rotate({heading})" for heading in (0, 90, 180, 270) }
+
+# Javascript function that sets the transforms of a list of vehicle elements, given a flat array of (x, y, heading) values.
+# It is used to update all vehicles with a single call across the Python/Javascript boundary.
+_apply_vehicle_transforms = js.Function.new("elements", "values", """
+    for (let i = 0; i < elements.length; i++) {
+        elements[i].setAttribute("transform", `translate(${values[3 * i] + 0.5}, ${values[3 * i + 1] + 0.5}) rotate(${values[3 * i + 2]})`);
+    }
+""")
+
 class VehicleView(View):
     """
     Renders a vehicle on the map.
@@ -28,11 +93,35 @@ class VehicleView(View):
     # Add a vehicle which can be selected by clicking on it, and display detailed information about it.
     selected_vehicle_id = None
 
+    # The views of the vehicles in the current model, by the unique id of the vehicle.
+    views: dict[int, "VehicleView"] = {}
+
+    # Vehicle positions and headings waiting to be written to the DOM in the next animation frame.
+    _pending: dict["VehicleView", tuple[int, int, int]] = {}
+
+    # The attributes shown in the agent information of the selected vehicle.
+    # The elements showing them are created once, and then only their text is changed, and only if it has changed.
+    information_attributes = ["unique_id", "pos", "energy_level", "world_model", "cargos"]
+    _information_elements: dict[str, Any] = {}
+    _information_texts: dict[str, str] = {}
+
+    # The route and world model space currently drawn for the selected vehicle, so that they are only redrawn when changed.
+    _shown_route: list | None = None
+    _shown_world_model: tuple | None = None
+
+    # The elements in which information about the selected vehicle is shown (see reset).
+    information_element: Any = None
+    route_element: Any = None
+    world_model_element: Any = None
+
+    # The outline of the whole map, which is the same for all world model spaces drawn in a model.
+    _map_outline = ""
+
     def __init__(self, ui: "UserInterface", agent: Vehicle):
         """
-        Draws the vehicle in its initial position.
-        The size of the vehicle reflects its load capacity.
-        The rotation reflects its heading.
+        Creates the view of a vehicle.
+        The vehicle is not drawn here. Instead, the markup of all vehicles is added to the map in one operation,
+        after which each view is given its SVG element (see TransportSystemView).
         It is assigned a random color, to makes it easier to follow a specific vehicle on the screen.
 
         Args:
@@ -41,16 +130,42 @@ class VehicleView(View):
         """
         self.ui = ui
         self.agent = agent
+        self.element = None
 
         # Draw the vehicle in a random color to make it easy to distinguish them.
-        self.color = "#" + "".join([agent.random.choice(list("0123456789abcdef")) for i in range(6)])
+        self.color = "#%06x" % agent.random.randrange(1 << 24)
+        VehicleView.views[agent.unique_id] = self
+
+        # Remember the drawn position and heading, so that stationary vehicles cause no DOM writes.
         (x, y) = agent.pos
-        with document.query("#vehicles"):
-            with g(id = f"vehicle_{agent.unique_id}", transform = f"translate({x + 0.5}, {y + 0.5}) rotate({agent.heading})"): 
-                height = (agent.capacity + 1) / (agent.max_load + 1) * 0.8
-                rect(x = -0.2, y = -height / 2, width = 0.4, height = height, fill = self.color)
-                # When a vehicle is clicked, print some data about it to the console.
-                event_listener("click", lambda _: self.select_vehicle())
+        self._last = (x, y, agent.heading)
+
+    def svg_markup(self) -> str:
+        """
+        Returns the SVG markup of the vehicle in its initial position.
+        The size of the vehicle reflects its load capacity.
+        The rotation reflects its heading.
+
+        Returns:
+            str: the markup.
+        """
+        (x, y, heading) = self._last
+        # The height is a fraction, so limit its precision to keep the markup short.
+        height = (self.agent.capacity + 1) / (self.agent.max_load + 1) * 0.8
+        return (f'<g id="vehicle_{self.agent.unique_id}" transform="translate({x + 0.5}, {y + 0.5}){_ROTATE[heading]}">'
+                f'<rect x="-0.2" y="{-height / 2:.3f}" width="0.4" height="{height:.3f}" fill="{self.color}"/></g>')
+
+    @staticmethod
+    def on_click(event: Any):
+        """
+        Handles clicks on the vehicles layer of the map, selecting the vehicle that was clicked.
+        A single event listener is used for all vehicles, and the vehicle is found from the id of the clicked group.
+
+        Args:
+            event (Any): the click event.
+        """
+        if group := event.target.closest("[id^='vehicle_']"):
+            VehicleView.views[int(group.id.removeprefix("vehicle_"))].select_vehicle()
 
     def select_vehicle(self):
         """
@@ -59,49 +174,139 @@ class VehicleView(View):
         """
         if VehicleView.selected_vehicle_id == self.agent.unique_id:
             VehicleView.selected_vehicle_id = None
-            document.query("#route").clear()
-            document.query("#world_model").clear()
+            VehicleView.route_element.innerHTML = ""
+            VehicleView.world_model_element.innerHTML = ""
         else:
             VehicleView.selected_vehicle_id = self.agent.unique_id
             self.ui.show_but_hide_siblings("#agent_information")
+        VehicleView.forget_shown_graphics()
         self.update(self.agent)
 
+    @staticmethod
+    def reset(space: RoadNetworkGrid):
+        """
+        Resets the state shared by all vehicle views, before the views of a new model are created.
+        The elements showing the selected vehicle are looked up here, since the route element is recreated with the road network.
+
+        Args:
+            space (RoadNetworkGrid): the space of the new model.
+        """
+        VehicleView.views.clear()
+        VehicleView.selected_vehicle_id = None
+        VehicleView._pending.clear()
+        VehicleView.forget_shown_graphics()
+        VehicleView.information_element = js.document.getElementById("agent_information")
+        VehicleView.route_element = js.document.getElementById("route")
+        VehicleView.world_model_element = js.document.getElementById("world_model")
+        (width, height) = (4 * space.width, 4 * space.height)
+        VehicleView._map_outline = f"M0,0 h{width} v{height} h-{width} z"
+
+    @staticmethod
+    def refresh_information():
+        """
+        Shows the current information about the selected vehicle, if there is one.
+        Used when the agent information panel is shown, since it is not updated while hidden.
+        """
+        if view := VehicleView.views.get(VehicleView.selected_vehicle_id):
+            view.show_information(view.agent)
+
+    @staticmethod
+    def forget_shown_graphics():
+        """
+        Forgets which route and world model space are drawn, so that they are redrawn in the next update.
+        """
+        VehicleView._shown_route = None
+        VehicleView._shown_world_model = None
+
     def update(self, agent: Vehicle):
         """
         Updates the position ahd heading of the vehicle by translating and rotating the SVG elements.
+        The new transform is not written immediately, but buffered until the next animation frame.
+        If the vehicle is stationary, nothing is written.
+        This way, all vehicles moved in a simulation step are written to the DOM in one batch.
 
         Args:
             agent (Vehicle): the agent model which the view is connected to.
         """
-        # Update vehicle positions
+        # Buffer the vehicle position, and make sure that the buffer is flushed in the next animation frame.
+        # Vehicles that have not moved or turned since the last update are skipped.
         (x, y) = agent.pos
-        with document.query(f"#vehicle_{agent.unique_id}") as g:
-            g["transform"] = f"translate({x + 0.5}, {y + 0.5}) rotate({agent.heading})"
+        state = (x, y, agent.heading)
+        if state != self._last:
+            self._last = state
+            VehicleView._pending[self] = state
+            request_frame_task(VehicleView, VehicleView._flush)
 
-        # If this vehicle is selected, show its information
+        # If this vehicle is selected, show its information and graphics in the next animation frame.
         if agent.unique_id == VehicleView.selected_vehicle_id:
-            with document.query("#agent_information").clear():
+            request_frame_task(VehicleView.show_selected, VehicleView.show_selected)
+
+    @staticmethod
+    def show_selected():
+        """
+        Shows the information, planned route, and world model space of the selected vehicle, if there is one.
+        Carried out in the animation frame before the next repaint, so it is done at most once per frame.
+        The selected vehicle is looked up here, since it may have been deselected or replaced since the task was requested.
+        """
+        if not (view := VehicleView.views.get(VehicleView.selected_vehicle_id)):
+            return
+        agent = view.agent
+
+        # The text includes the entire world model, so it is only formatted when the agent information is shown.
+        # Selecting a vehicle or opening the panel from the menu refreshes the text, so it is never stale when it becomes visible.
+        if VehicleView.information_element.classList.contains("shown"):
+            view.show_information(agent)
+
+        # Draw its planned route if it has one, and it has changed.
+        # Routes are replaced rather than modified when the vehicle moves, so the drawn route can be compared to the current one.
+        wm = agent.world_model
+        if wm.plan and hasattr(wm.plan[0], "route") and wm.plan[0].route != VehicleView._shown_route:
+            route_nodes = wm.plan[0].route
+            VehicleView._shown_route = route_nodes
+            # The route is drawn as a single polyline through the centers of its nodes.
+            points = " ".join(f"{x + 0.5},{y + 0.5}" for (x, y) in route_nodes)
+            VehicleView.route_element.innerHTML = f'<polyline class="route" points="{points}"/>'
+                        
+        # Show its world view space if it has one, and it has changed
+        (x, y) = agent.pos
+        dist = agent.perception_range
+        if (x, y, dist) != VehicleView._shown_world_model:
+            VehicleView._shown_world_model = (x, y, dist)
+            # The space outside the perception range is the whole map with a hole cut out around the vehicle.
+            hole = f"M{x - dist},{y - dist} v{2 * dist + 1} h{2 * dist + 1} v-{2 * dist + 1} z"
+            VehicleView.world_model_element.innerHTML = f'<path class="world_model_space" fill-rule="evenodd" d="{VehicleView._map_outline} {hole}"/>'
+
+    def show_information(self, agent: Vehicle):
+        """
+        Shows the information about the vehicle in the agent information panel.
+        The first time, the elements of the panel are created. After that, only the texts that have changed are written.
+
+        Args:
+            agent (Vehicle): the agent model which the view is connected to.
+        """
+        if not VehicleView._information_elements:
+            with wrap(VehicleView.information_element).clear():
                 h3("Agent information")
-                attributes = ["unique_id", "pos", "energy_level", "world_model", "cargos"]
-                for a in attributes:
-                    p(f"{a}: {getattr(agent, a)}")
-
-            # Draw its planned route if it has one
-            wm = agent.world_model
-            if wm.plan and hasattr(wm.plan[0], "route"):
-                route_nodes = wm.plan[0].route
-                with document.query("#route").clear():
-                    for (x1, y1), (x2, y2) in zip(route_nodes[0: -1], route_nodes[1:]):
-                        line(cls = "route", x1 = x1 + 0.5, y1 = y1 + 0.5, x2 = x2 + 0.5, y2 = y2 + 0.5)
-                            
-            # Show its world view space if it has one
-            with document.query("#world_model").clear():
-                width = 4 * agent.model.space.width
-                height = 4 * agent.model.space.height                      
-                (x, y) = agent.pos
-                dist = self.agent.perception_range
-                path(cls = "world_model_space", fill_rule = "evenodd", 
-                     d = f"M0,0 h{width} v{height} h-{width} z M{x - dist},{y - dist} v{2 * dist + 1} h{2 * dist + 1} v-{2 * dist + 1} z")
+                for a in VehicleView.information_attributes:
+                    with p() as element:
+                        VehicleView._information_elements[a] = element.unwrap()
+        for a, element in VehicleView._information_elements.items():
+            text = f"{a}: {getattr(agent, a)}"
+            if VehicleView._information_texts.get(a) != text:
+                VehicleView._information_texts[a] = text
+                element.textContent = text
+
+    @staticmethod
+    def _flush():
+        """
+        Writes all buffered vehicle positions and headings to the DOM.
+        Carried out in the animation frame before the next repaint.
+        The elements and the values are passed to Javascript as two arrays, with the values packed in a typed array.
+        """
+        elements = [view.element for view in VehicleView._pending.keys()]
+        values = array.array("f", [v for state in VehicleView._pending.values() for v in state])
+        _apply_vehicle_transforms(to_js(elements), to_js(values))
+        VehicleView._pending.clear()
 
 class CargoView(View):
     """
@@ -109,7 +314,7 @@ class CargoView(View):
     """
     def __init__(self, ui: "UserInterface", agent: Cargo):
         """
-        Draws the cargo in its initial position.
+        Draws the cargo in its initial position, as a child of the current DOM element.
 
         Args:
             ui (UserInterface): the user interface of which this view is a part.
@@ -119,9 +324,11 @@ class CargoView(View):
 
         # Draw the cargo as a circle.
         (x, y) = agent.pos
-        with document.query("#cargos"):
-            with g(cls = "cargo", id = f"cargo_{agent.unique_id}", transform = f"translate({x + 0.5}, {y + 0.5})"):
-                circle(cx = 0, cy = 0, r = 0.15)
+        with g(cls = "cargo", id = f"cargo_{agent.unique_id}", transform = f"translate({x + 0.5}, {y + 0.5})") as group:
+            circle(cx = 0, cy = 0, r = 0.15)
+
+        # Keep a reference to the SVG element, since it is not yet part of the document when the view is first updated.
+        self.element = group.unwrap()
 
     def update(self, agent: Cargo):
         """
@@ -131,18 +338,27 @@ class CargoView(View):
             agent (Cargo): the agent model which the view is connected to.
         """
         (x, y) = agent.pos
-        with document.query(f"#cargo_{agent.unique_id}") as g:
-            g["transform"] = f"translate({x + 0.5}, {y + 0.5})"
+        self.element.setAttribute("transform", f"translate({x + 0.5}, {y + 0.5})")
 
 class RoadNetworkGridView(View):
     """
     Provides a view of the road network.
     """
+    # The map layers drawn by this view.
+    layers = ["#grid", "#coarse_road_network", "#road_network"]
+
+    # Cache of the rendered map layers of recently generated road networks, keyed by the parameters from which they were generated.
+    # The cache is kept on the class, since the view is recreated each time a new model is generated.
+    _cache: dict[tuple, list[str]] = {}
+    _cache_size = 4
+
     def update(self, space: RoadNetworkGrid):
         """
         Updates the map, clearing any previous graphics.
         When drawing the graphics, the internal scale in the SVG is one cell to one unit.
         The viewBox is set to the entire graph, and the graphics is scaled through SVG element styling.
+        The road network is generated deterministically from the random seed and the road network parameters.
+        Therefore, if a road network with the same seed and parameters has been drawn recently, its graphics is reused.
 
         Args:
             model (TransportSystem): the transport system model to be reflected in the user interface.
@@ -150,35 +366,43 @@ class RoadNetworkGridView(View):
         with document.query("#map") as m:
             m["viewBox"] = f"0 0 {space.width * 4} {space.height * 4}"
 
-        with document.query("#grid").clear():
-            # Visualize the coarse grid
-            for x in range(0, space.width + 1):
-                line(cls = "grid_line", x1 = 4 * x, y1 = 0, x2 = 4 * x, y2 = 4 * space.height)
-            for y in range(0, space.height + 1):
-                line(cls = "grid_line", x1 = 0, y1 = 4 * y, x2 = 4 * space.width, y2 = 4 * y)
-
-        with document.query("#coarse_road_network").clear():
-            # Visualize roads
-            for (x1, y1), (x2, y2) in space.coarse_network.edges:
-                line(cls = "coarse_road", x1 = 4 * x1 + 2, y1 = 4 * y1 + 2, x2 = 4 * x2 + 2, y2 = 4 * y2 + 2)
-
-        with document.query("#road_network").clear():
-            # Visualize roads
-            for (x1, y1), (x2, y2) in space.road_edges():
-                line(cls = "road", x1 = x1 + 0.5, y1 = y1 + 0.5, x2 = x2 + 0.5, y2 = y2 + 0.5)
-
-            # Placeholder for vehicle route information
-            g(id = "route")
-
-            # Visualize destinations and charging points.
-            for node in space.road_nodes(space.is_destination):
-                (x, y) = node
-                if space.is_charging_point(node):
-                    with g(cls = "charging_point", transform = f"translate({x}, {y})"):
-                        circle(cx =  0.5, cy = 0.5, r = 0.25)
-                        polygon(points = "0.52,0.30 0.35,0.55 0.48,0.55 0.48,0.70 0.65,0.45 0.52,0.45 0.52,0.30")
-                else:
-                    circle(cls = "destination", cx =  0.5, cy = 0.5, r = 0.25, transform = f"translate({x}, {y})")
+        # If the road network has been drawn before, reuse the graphics.
+        key = (space.model.random_seed, *space.model.configuration.data["RoadNetworkGrid"].values())
+        if key in RoadNetworkGridView._cache:
+            for q, markup in zip(self.layers, RoadNetworkGridView._cache[key]):
+                document.query(q).inner_html(markup)
+            return
+
+        # Visualize the coarse grid as a single path.
+        (width, height) = (4 * space.width, 4 * space.height)
+        grid_lines = [f"M{4 * x} 0V{height}" for x in range(0, space.width + 1)] + [f"M0 {4 * y}H{width}" for y in range(0, space.height + 1)]
+        document.query("#grid").inner_html(f'<path class="grid_line" d="{"".join(grid_lines)}"/>')
+
+        # Visualize coarse roads as a single path.
+        coarse_roads = "".join(f"M{4 * x1 + 2} {4 * y1 + 2}L{4 * x2 + 2} {4 * y2 + 2}" for (x1, y1), (x2, y2) in space.coarse_network.edges)
+        document.query("#coarse_road_network").inner_html(f'<path class="coarse_road" d="{coarse_roads}"/>')
+
+        # Visualize roads as a single path, and add destinations and charging points.
+        # The content is built as a string and added to the document in one operation.
+        # Road nodes have integer coordinates, so their offsets to the cell centers are formatted once and looked up.
+        offsets = [f"{i + 0.5}" for i in range(4 * max(space.width, space.height))]
+        roads = "".join(f"M{offsets[x1]} {offsets[y1]}L{offsets[x2]} {offsets[y2]}" for (x1, y1), (x2, y2) in space.road_edges())
+        content = [f'<path class="road" d="{roads}"/>']
+
+        # Placeholder for vehicle route information
+        content.append('<g id="route"/>')
+
+        # Visualize destinations and charging points, by referring to the markers defined in the map.
+        for node in space.destination_nodes():
+            (x, y) = node
+            marker = "charging_point_marker" if space.is_charging_point(node) else "destination_marker"
+            content.append(f'<use href="#{marker}" x="{x}" y="{y}"/>')
+        document.query("#road_network").inner_html("".join(content))
+
+        # Store the graphics in the cache, removing the oldest entry if the cache is full.
+        RoadNetworkGridView._cache[key] = [document.query(q).unwrap().innerHTML for q in self.layers]
+        if len(RoadNetworkGridView._cache) > RoadNetworkGridView._cache_size:
+            del RoadNetworkGridView._cache[next(iter(RoadNetworkGridView._cache))]
 
 class TransportSystemView(View):
     """
@@ -191,28 +415,44 @@ class TransportSystemView(View):
         Args:
             ui (UserInterface): the user interface of which this view is a part.
         """
+        # Keep a reference to the text of the time indicator, which is updated in every step.
+        # Changing the value of the text node in place avoids replacing the children of the indicator.
+        self.time_text = js.document.getElementById("time").firstChild
+
         # Add a space view.
         ui.model.space.add_view(RoadNetworkGridView())
 
-        # Add agent views
-        document.query("#vehicles").clear()
-        document.query("#cargos").clear()
-        for agent in ui.model.agents():
-            if isinstance(agent, Vehicle):
-                agent.add_view(VehicleView(ui, agent))
-            elif isinstance(agent, Cargo):
-                agent.add_view(CargoView(ui, agent))
+        # Add agent views, discarding any views and buffered updates of vehicles from a previous model.
+        VehicleView.reset(ui.model.space)
+
+        # The whole fleet is added to the map as one string, and the views then keep references to their elements.
+        vehicle_views = [VehicleView(ui, agent) for agent in ui.model.agents() if isinstance(agent, Vehicle)]
+        with document.query("#vehicles") as vehicles:
+            vehicles.inner_html("".join(view.svg_markup() for view in vehicle_views))
+            for view, element in zip(vehicle_views, vehicles.unwrap().children):
+                view.element = element
+                view.agent.add_view(view)
+        with fragment("#cargos"):
+            for agent in ui.model.agents():
+                if isinstance(agent, Cargo):
+                    agent.add_view(CargoView(ui, agent))
 
     def update(self, model: TransportSystem):
         """
         Updates the time indicator in the user interface.
+        Since the time cannot be perceived faster than the screen is repainted, it is written in the next animation frame.
 
         Args:
             model (TransportSystem): the model.
         """
-        t = model.time()
-        with document.query("#time") as p:
-            p.inner_html(int(t))
+        self.time = int(model.time())
+        request_frame_task(self, self.write_time)
+
+    def write_time(self):
+        """
+        Writes the current time to the time indicator.
+        """
+        self.time_text.nodeValue = str(self.time)
 
 async def open_file() -> tuple[str, str]:
     """
@@ -231,19 +471,28 @@ async def open_file() -> tuple[str, str]:
         data = await file.text()
     return file_handle.name, data
 
-async def save_file_as(data: str) -> str:
+async def save_file_as(data: str | bytes, chunk_size: int = 1 << 20) -> str:
     """
     Opens the file picker dialog and saves the data to the file selected by the user.
+    The data is written in chunks, so that only one chunk at a time needs to be copied to Javascript.
 
     Args:
-        data (str): the data to be saved.
+        data (str | bytes): the data to be saved.
+        chunk_size (int, optional): the number of characters or bytes written at a time. Defaults to 1 MiB.
 
     Returns:
         str: the name of the selected file.
     """
     file_handle = await js.window.showSaveFilePicker()
     writable = await file_handle.createWritable()
-    await writable.write(data)
+    if isinstance(data, bytes):
+        # Slicing a memoryview does not copy, so the only copy of each chunk is the conversion to a Javascript array.
+        view = memoryview(data)
+        for i in range(0, len(view), chunk_size):
+            await writable.write(to_js(view[i: i + chunk_size]))
+    else:
+        for i in range(0, len(data), chunk_size):
+            await writable.write(data[i: i + chunk_size])
     await writable.close()
     return file_handle.name
 
@@ -261,19 +510,20 @@ class SimulationController:
         self.ui = ui
         self.timer = None
         self.simulation_delay = 250.0 # Delay between simulation steps in milliseconds
-        self.zoom_level = 1.0
+        self.max_steps_per_frame = 4 # Limit on steps taken in one frame to catch up, if frames are slower than the delay
+        self.last_step_time = 0.0
+
+        # The proxy for the animation frame callback is created once, and reused in every frame.
+        self.tick_proxy = create_proxy(self.tick)
 
-        # The panning state is calculated for the center of the map to make zooming perform correctly
-        self.pan_x = -self.ui.model.space.width / 2
-        self.pan_y = -self.ui.model.space.height / 2
         with document.query("#controls").clear():
             with div(id = "simulation_controls"):
                 with button("Step"):
-                    event_listener("click", lambda _: self.step())
+                    event_listener("click", self.step)
                 with button("Run"):
-                    event_listener("click", lambda _: self.run())
+                    event_listener("click", self.run)
                 with button("Stop"):
-                    event_listener("click", lambda _: self.stop())
+                    event_listener("click", self.stop)
                 with button("Slower"):
                     event_listener("click", lambda _: self.set_simulation_delay(2.0))
                 with button("Faster"):
@@ -292,11 +542,28 @@ class SimulationController:
                     event_listener("click", lambda _: self.transform_map(x = 0, y = 1))
                 with button("Down"):
                     event_listener("click", lambda _: self.transform_map(x = 0, y = -1))
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the state that depends on the model, by stopping any running simulation and resetting zooming and panning.
+        This is used when a new model has been generated, so that the controls need not be recreated.
+        """
+        self.stop()
+        self.zoom_level = 1.0
+
+        # The panning state is calculated for the center of the map to make zooming perform correctly
+        self.pan_x = -self.ui.model.space.width / 2
+        self.pan_y = -self.ui.model.space.height / 2
         self.transform_map()
         
-    def step(self):
+    def step(self, event: Any = None):
         """
         Executes one step of the simulation.
+        Can be used as an event handler.
+
+        Args:
+            event (Any): the event to be handled (ignored).
         """
         try:
             self.ui.model.step()
@@ -305,18 +572,50 @@ class SimulationController:
             self.stop()
             raise e
 
-    def run(self):
+    def run(self, event: Any = None):
         """
         Runs the simulation by repeatedly invoking step (with a small delay between steps).
+        The steps are driven by animation frames, so that they are aligned with the repainting of the screen.
+        Can be used as an event handler.
+
+        Args:
+            event (Any): the event to be handled (ignored).
         """
-        self.timer = js.setInterval(create_proxy(self.step), self.simulation_delay)
+        if not self.timer:
+            # Let the first step happen in the first frame.
+            self.last_step_time = js.performance.now() - self.simulation_delay
+            self.timer = js.requestAnimationFrame(self.tick_proxy)
 
-    def stop(self):
+    def tick(self, timestamp: float):
+        """
+        Called in each animation frame while the simulation is running.
+        Steps are executed at a fixed rate of one per simulation delay, independently of the frame rate.
+        If the delay is shorter than the time between frames, several steps are executed in one frame.
+        Since view updates are buffered until the frame is painted, only the last of those steps is drawn.
+        If the simulation falls too far behind, the remaining steps are skipped rather than caught up.
+
+        Args:
+            timestamp (float): the time of the animation frame in milliseconds.
+        """
+        self.timer = js.requestAnimationFrame(self.tick_proxy)
+        steps = 0
+        while timestamp - self.last_step_time >= self.simulation_delay and steps < self.max_steps_per_frame:
+            self.last_step_time += self.simulation_delay
+            self.step()
+            steps += 1
+        if timestamp - self.last_step_time >= self.simulation_delay:
+            self.last_step_time = timestamp
+
+    def stop(self, event: Any = None):
         """
         Stops a running simulation.
+        Can be used as an event handler.
+
+        Args:
+            event (Any): the event to be handled (ignored).
         """
         if self.timer:
-            js.clearInterval(self.timer)
+            js.cancelAnimationFrame(self.timer)
             self.timer = None
 
     def set_simulation_delay(self, factor: float):
@@ -326,11 +625,8 @@ class SimulationController:
         Args:
             factor (int): the factor by which the simulation delay is multiplied.
         """
+        # A running simulation picks up the new delay in the next animation frame.
         self.simulation_delay = self.simulation_delay * factor
-        # If the simulation is running, restart it with the new delay.
-        if self.timer:
-            self.stop()
-            self.run()
 
     def transform_map(self, zoom: float = 1.0, x: int = 0, y: int = 0):
         """
@@ -362,12 +658,34 @@ class ConfigurationController:
             ui (UserInterface): the user interface of which this controller is a part.
         """
         self.ui = ui
+        self.fields: dict[tuple[str, str], tuple[type, Any]] = dict()
         self.update()
 
     def update(self):
         """
         Updates the configuration controller to match the current configuration.
+        The input fields are stored together with the parameter types, keyed by class and parameter name.
+        This way, they can be read without querying the DOM or the parameter definitions.
+        If the fields already match the parameters, only their values are updated, and otherwise the controls are rebuilt.
         """
+        data = self.ui.configuration.data
+        if list(self.fields.keys()) == [(cls, p) for cls, params in data.items() for p in params]:
+            for (cls, p), (param_type, field) in self.fields.items():
+                if param_type == bool:
+                    field.checked = data[cls][p]
+                else:
+                    field.value = data[cls][p]
+        else:
+            self.create_controls()
+
+        # Show the random seed actually used, which differs from the parameter value if that is -1.
+        self.fields[("TransportSystem", "random_seed")][1].value = self.ui.model.random_seed
+
+    def create_controls(self):
+        """
+        Creates the input fields and the generate button, replacing any previous ones.
+        """
+        self.fields = dict()
         with document.query("#configuration").clear():
             h3("Configuration parameters")
             with div(id = "configuration_controls"):
@@ -376,35 +694,32 @@ class ConfigurationController:
                         summary(cls)
                         for p, v in params.items():
                             # Add a label with the parameter name, and the help text as a tooltip
-                            if self.ui.configuration.params[cls][p]["type"] == bool:
+                            param_type = self.ui.configuration.params[cls][p]["type"]
+                            if param_type == bool:
                                 # Boolean params are shown as a checkbox with a label
                                 with input_(id = p, type = "checkbox") as checkbox:
-                                    if self.ui.configuration.data[cls][p]:
+                                    if v:
                                         checkbox["checked"] = "" # Empty string means that it will appear as checked
+                                self.fields[(cls, p)] = (param_type, checkbox.unwrap())
                                 label(p)
                             else:
                                 # Non-boolean params are shown as a label and an input field
                                 label(p, title = self.ui.configuration.params[cls][p]["help"])
-                                input_(id = p, value = v) 
+                                self.fields[(cls, p)] = (param_type, input_(id = p, value = v).unwrap())
                 with button("Generate", title = "Generates a new model based on the provided configuration parameters"):
                     event_listener("click", lambda _: self.generate())
-        with document.query("#random_seed") as field:
-            field.value = self.ui.model.random_seed
 
     def generate(self):
         """
         Generates a new model based on parameter values in the input fields in the simulation controls.
         If no value is provided, the default parameter value is used instead.
         """
-        for cls, params in self.ui.configuration.data.items():
-                for p, _ in params.items():
-                    with document.query("#" + p) as field:
-                        param_type = self.ui.configuration.params[cls][p]["type"]
-                        if param_type == bool:
-                            self.ui.configuration.set_param_value(cls, p, field.unwrap().checked)
-                        else:
-                            if field.value != "":
-                                self.ui.configuration.set_param_value(cls, p, param_type(field.value))
+        for (cls, p), (param_type, field) in self.fields.items():
+            if param_type == bool:
+                self.ui.configuration.set_param_value(cls, p, field.checked)
+            else:
+                if field.value != "":
+                    self.ui.configuration.set_param_value(cls, p, param_type(field.value))
         self.ui.reinitialize()
 
 class ViewController:
@@ -464,8 +779,10 @@ class DataCollectorView:
             ui (UserInterface): the user interface of which this element is a part.
         """
         self.ui = ui
-        with div(id = "data_view", style = "display: none;"):
+        with div(id = "data_view"):
             with div(id = "collected_data"):
+                # The table selector is recreated for each model, so changes to it are handled here, to register the handler only once.
+                event_listener("change", self.select_table)
                 p("Generate a model with data collection enabled to view data")
 
     def update(self):
@@ -479,7 +796,6 @@ class DataCollectorView:
                         for table_name in dc.tables.keys():
                             if dc.has_rows(table_name):
                                 option(table_name, value = table_name)
-                        event_listener("click", self.select_table)
                     div(id = "data_table")
                 else:
                     p("Run simulation to collect some data")
@@ -511,6 +827,7 @@ class MenuBar:
             ui (UserInterface): the user interface of which this element is a part.
         """
         self.ui = ui
+        self.style_information: str | None = None
         with nav(id = "menubar"):
             with ul():
                 with li("File"):
@@ -549,6 +866,10 @@ class MenuBar:
         def handler(event):
             self.ui.show_but_hide_siblings("#simulation_view")
             self.ui.show_but_hide_siblings(q)
+
+            # The agent information is not updated while hidden, so refresh it when it is shown.
+            if q == "#agent_information":
+                VehicleView.refresh_information()
         return handler
 
     async def open_configuration(self, event: Any):
@@ -585,7 +906,7 @@ class MenuBar:
             with zipfile.ZipFile(zip_buffer, "w") as zip_file:
                 for file_name, content in archive.items():
                     zip_file.writestr(file_name, content)
-            await save_file_as(js.Uint8Array.new(zip_buffer.getvalue()))
+            await save_file_as(zip_buffer.getvalue())
         except Exception as e:
             print(f"Save model as zip failed with exception {e}")
 
@@ -597,8 +918,10 @@ class MenuBar:
             event (Any): the event (not used).
         """
         try:
-            # Extract the CSS style information from the document
-            style_information = "\n".join([rule.cssText for sheet in js.document.styleSheets for rule in sheet.cssRules])
+            # Extract the CSS style information from the document.
+            # The style sheets do not change while the application runs, so this is only done for the first save.
+            if self.style_information is None:
+                self.style_information = "\n".join([rule.cssText for sheet in js.document.styleSheets for rule in sheet.cssRules])
             with document.query("#map") as m:
                 # Serialize the clone tree as a string in XML format
                 content = js.XMLSerializer.new().serializeToString(m.unwrap())
@@ -608,7 +931,7 @@ class MenuBar:
                 content = doctype + content
 
                 # Insert style information, properly wrapped as CDATA.
-                content = content.replace("</style>", f"<![CDATA[{style_information}]]></style>")
+                content = content.replace("</style>", f"<![CDATA[{self.style_information}]]></style>")
 
                 # Let the user select a file, and save the content prepended with the doctype
                 await save_file_as(content)
@@ -630,6 +953,9 @@ class UserInterface:
         self.model = model
         self.configuration = configuration
 
+        # The panels that can be shown, and their parents, by query string (see show_but_hide_siblings).
+        self.panels: dict[str, tuple[Any, Any]] = dict()
+
         # Remove load message, set cursor to default
         with document.query("#load_msg") as e:
             e.remove()
@@ -640,8 +966,9 @@ class UserInterface:
         # Setup main layout
         with document.query("body"):
             self.menu_bar = MenuBar(self)
-            with main():
-                with div(id = "simulation_view"):
+            # Panels of which only one at a time is shown, marked by the class "shown" (see show_but_hide_siblings)
+            with main(cls = "panels"):
+                with div(id = "simulation_view", cls = "shown"):
                     with div(id = "main_grid"):
                         with div(id = "simulation"):
                             div(id = "controls")
@@ -650,45 +977,58 @@ class UserInterface:
                                     # Placeholders for adding style information when exporting SVG to file
                                     with defs():
                                         style(type = "text/css")
+                                        # Markers that are drawn at every destination and charging point of the road network
+                                        circle(id = "destination_marker", cls = "destination", cx = 0.5, cy = 0.5, r = 0.25)
+                                        with g(id = "charging_point_marker", cls = "charging_point"):
+                                            circle(cx = 0.5, cy = 0.5, r = 0.25)
+                                            polygon(points = "0.52,0.30 0.35,0.55 0.48,0.55 0.48,0.70 0.65,0.45 0.52,0.45 0.52,0.30")
                                     # Layers of map content, that can be shown or hidden separately
                                     g(id = "grid")
                                     g(id = "coarse_road_network")
                                     g(id = "road_network")
                                     g(id = "world_model")
-                                    g(id = "vehicles")
+                                    with g(id = "vehicles"):
+                                        event_listener("click", VehicleView.on_click)
                                     g(id = "cargos")
                             self.simulation_controller = SimulationController(self)
-                        with div(id = "content"):
-                            with div(id = "configuration"):
+                        with div(id = "content", cls = "panels"):
+                            with div(id = "configuration", cls = "shown"):
                                 self.configuration_controller = ConfigurationController(self)
-                            with div(id = "agent_information", style = "display: none;"):
+                            with div(id = "agent_information"):
                                 h3("Agent information")
                                 p("Select an agent to display information about it")
-                            with div(id = "view_settings", style = "display: none;"):
+                            with div(id = "view_settings"):
                                 self.view_controller = ViewController(self)
-                            create_tag("py-repl")(id = "py-repl", style = "display: none;")
+                            create_tag("py-repl")(id = "py-repl")
                 self.data_collector_view = DataCollectorView(self)
         model.add_view(TransportSystemView(self))
 
     def show_but_hide_siblings(self, q: str):
         """
         Shows the element that matches the query string q, while hiding all its direct siblings.
+        The element must be a child of an element with the class "panels".
+        Only the child with the class "shown" is displayed, so showing an element just moves that class to it.
 
         Args:
             q (str): a query string that yields the element to be shown.
         """
-        # Hide all siblings of the selected element
-        for element in document.query(q).parent_element.children:
-            element.unwrap().style.display = "none"
+        # The layout is fixed once created, so the element and its parent are only looked up the first time.
+        if q not in self.panels:
+            element = document.query(q).unwrap()
+            self.panels[q] = (element, element.parentElement)
+        (element, parent) = self.panels[q]
 
-        # Show the selected element
-        document.query(q).visible(True)
+        # Hide the currently shown sibling, and show the selected element
+        if shown := parent.querySelector(":scope > .shown"):
+            shown.classList.remove("shown")
+        element.classList.add("shown")
 
     def reinitialize(self):
         """
         Reinitialize the model and its views.
         """
         self.model.__init__(self.configuration)
+        self.simulation_controller.reset()
         self.model.clear_views()
         self.model.add_view(TransportSystemView(self))
         self.configuration_controller.update()
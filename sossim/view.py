@@ -22,6 +22,11 @@ class Viewable:
     A mixin class for objects to which a view can be attached. 
     It adds the methods for handling views attached to the viewable, unless such a method already exists.
     """
+    # The class attribute is an empty default, which is shared by all instances without views.
+    # The views are kept in a tuple, so that they are replaced rather than modified when a view is added.
+    # The type is given by the constructor rather than an annotation, since configurable() treats class annotations as parameters.
+    _views = tuple[View, ...]()
+
     def add_view(self, view: View):
         """
         Adds a view to the viewable object.
@@ -29,9 +34,7 @@ class Viewable:
         Args:
             view (Any): the view.
         """
-        if not hasattr(self, "_views"):
-            self._views = []
-        self._views += [view]
+        self._views = (*self._views, view)
         self.update_views()
 
     def get_views(self) -> list[View]:
@@ -41,16 +44,12 @@ class Viewable:
         Returns:
             list[View]: the views.
         """
-        if not hasattr(self, "_views"):
-            self._views = []
-        return self._views
+        return list(self._views)
 
     def update_views(self):
         """
         Updates the views.
         """
-        if not hasattr(self, "_views"):
-            self._views = []
         for view in self._views:
             view.update(self)
 
@@ -58,4 +57,4 @@ class Viewable:
         """
         Removes all views.
         """
-        self._views = []
\ No newline at end of file
+        self._views = ()
\ No newline at end of file